@@ -1,9 +1,9 @@
 import random
 import httpx
 import os
-from datetime import datetime
+from datetime import datetime, timezone
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select, insert, delete, cast, literal, Integer, Float, BigInteger
 from app import models
 from app.exceptions import ExternalAPIException
 from PIL import Image, ImageDraw, ImageFont
@@ -138,3 +138,198 @@ def create_country_obj(country_dict):
     Utility to create a Country SQLAlchemy object from a dict.
     """
     return models.Country(**country_dict)
+
+
+# -------------------------------
+# Country history (time series)
+# -------------------------------
+# Named bucket sizes accepted by the history endpoint, in seconds.
+HISTORY_BUCKETS = {
+    "raw": 0,
+    "hour": 3600,
+    "day": 86400,
+    "week": 604800,
+}
+
+# The Unix epoch fell on a Thursday; shifting by four days makes week
+# buckets start on Monday 00:00 UTC.
+WEEK_BUCKET_OFFSET = 4 * 86400
+
+# Retention tiers: points older than `age` seconds are rolled up into
+# `bucket` second buckets. Ordered from finest to coarsest.
+HISTORY_RETENTION = [
+    (7 * 86400, 3600),      # raw points kept for a week, then hourly
+    (90 * 86400, 86400),    # hourly points kept for 90 days, then daily
+    (365 * 86400, 604800),  # daily points kept for a year, then weekly
+]
+
+# Points older than this are dropped altogether.
+HISTORY_MAX_AGE = 5 * 365 * 86400
+
+
+def _epoch(dt: datetime) -> int:
+    """UTC epoch seconds for `dt`; naive datetimes are treated as UTC."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def record_country_history(db: Session, countries: list, recorded_at: datetime):
+    """
+    Append one history row per country in a single batched INSERT.
+    Does not commit, so it lands in the same transaction as the refresh.
+    """
+    ts = _epoch(recorded_at)
+    rows = [
+        {
+            "country_name": c["name"],
+            "recorded_at": ts,
+            "resolution": 0,
+            "samples": 1,
+            "population_samples": int(c.get("population") is not None),
+            "exchange_rate_samples": int(c.get("exchange_rate") is not None),
+            "estimated_gdp_samples": int(c.get("estimated_gdp") is not None),
+            "population": c.get("population"),
+            "exchange_rate": c.get("exchange_rate"),
+            "estimated_gdp": c.get("estimated_gdp"),
+        }
+        for c in countries
+    ]
+    if rows:
+        db.execute(insert(models.CountryHistory), rows)
+
+
+def _weighted_avg(column, weight):
+    """Average of `column` weighted by its non-NULL sample count."""
+    return func.sum(cast(column, Float) * weight) / func.nullif(func.sum(weight), 0)
+
+
+def _bucket_offset(size: int) -> int:
+    return WEEK_BUCKET_OFFSET if size == HISTORY_BUCKETS["week"] else 0
+
+
+def _bucket_start(size: int):
+    h = models.CountryHistory
+    offset = _bucket_offset(size)
+    shifted = h.recorded_at - offset
+    return shifted - (shifted % size) + offset
+
+
+def get_history_name(db: Session, name: str):
+    """
+    Name a country's history is stored under (case-insensitive match), or
+    None if it has none. History outlives the country row, so this is the
+    fallback once a country has been deleted.
+    """
+    h = models.CountryHistory
+    return (
+        db.query(h.country_name)
+        .filter(func.lower(h.country_name) == name.lower())
+        .limit(1)
+        .scalar()
+    )
+
+
+def get_country_history(db: Session, name: str, start: datetime = None, end: datetime = None, bucket: str = "raw"):
+    """
+    Return a country's history between `start` and `end`, downsampled in SQL
+    to the requested bucket size.
+    """
+    h = models.CountryHistory
+    size = HISTORY_BUCKETS[bucket]
+
+    if size:
+        ts = _bucket_start(size)
+        query = select(
+            ts.label("recorded_at"),
+            func.sum(h.samples).label("samples"),
+            _weighted_avg(h.population, h.population_samples).label("population"),
+            _weighted_avg(h.exchange_rate, h.exchange_rate_samples).label("exchange_rate"),
+            _weighted_avg(h.estimated_gdp, h.estimated_gdp_samples).label("estimated_gdp"),
+        )
+    else:
+        query = select(h.recorded_at, h.samples, h.population, h.exchange_rate, h.estimated_gdp)
+
+    query = query.where(h.country_name == name)
+    if start:
+        query = query.where(h.recorded_at >= _epoch(start))
+    if end:
+        query = query.where(h.recorded_at <= _epoch(end))
+
+    if size:
+        query = query.group_by(ts).order_by(ts)
+    else:
+        query = query.order_by(h.recorded_at)
+
+    return [
+        {
+            "timestamp": datetime.fromtimestamp(row.recorded_at, timezone.utc),
+            "samples": row.samples,
+            "population": round(row.population) if row.population is not None else None,
+            "exchange_rate": row.exchange_rate,
+            "estimated_gdp": row.estimated_gdp,
+        }
+        for row in db.execute(query)
+    ]
+
+
+def compact_country_history(db: Session, now: datetime = None):
+    """
+    Roll old history points into coarser buckets according to
+    HISTORY_RETENTION and drop points older than HISTORY_MAX_AGE. Per
+    country this keeps at most a week of raw points plus roughly 2,000
+    hourly, 275 daily and 210 weekly rows. Returns how many rows the table
+    shrank by (deleted points minus rollup rows inserted).
+
+    Stale points are locked (SELECT ... FOR UPDATE) before each rollup, so
+    concurrent refreshes compact one at a time: a second run waits for the
+    first to commit and then no longer sees the points it rolled up.
+    """
+    h = models.CountryHistory
+    now_ts = _epoch(now or datetime.now(timezone.utc))
+    removed = 0
+
+    for age, size in HISTORY_RETENTION:
+        # Align the cutoff to a bucket boundary so a bucket is never split
+        # between a compacted row and later finer rows.
+        offset = _bucket_offset(size)
+        cutoff = now_ts - age - offset
+        cutoff -= cutoff % size
+        cutoff += offset
+        stale = (h.recorded_at < cutoff, h.resolution < size)
+
+        # Lock in id order so two runs can't deadlock on each other.
+        db.execute(select(h.id).where(*stale).order_by(h.id).with_for_update()).all()
+
+        ts = _bucket_start(size)
+        rollup = (
+            select(
+                h.country_name,
+                ts,
+                literal(size, Integer),
+                func.sum(h.samples),
+                func.sum(h.population_samples),
+                func.sum(h.exchange_rate_samples),
+                func.sum(h.estimated_gdp_samples),
+                cast(func.round(_weighted_avg(h.population, h.population_samples)), BigInteger),
+                _weighted_avg(h.exchange_rate, h.exchange_rate_samples),
+                _weighted_avg(h.estimated_gdp, h.estimated_gdp_samples),
+            )
+            .where(*stale)
+            .group_by(h.country_name, ts)
+        )
+        inserted = db.execute(
+            insert(h).from_select(
+                ["country_name", "recorded_at", "resolution", "samples",
+                 "population_samples", "exchange_rate_samples", "estimated_gdp_samples",
+                 "population", "exchange_rate", "estimated_gdp"],
+                rollup,
+            )
+        )
+        deleted = db.execute(delete(h).where(*stale)).rowcount
+        removed += deleted - inserted.rowcount
+
+    removed += db.execute(delete(h).where(h.recorded_at < now_ts - HISTORY_MAX_AGE)).rowcount
+
+    db.commit()
+    return removed
@@ -1,4 +1,9 @@
+from typing import Optional
+
+from fastapi import Header
 from app.database import SessionLocal
+from app.exceptions import NotFoundException, ForbiddenException
+from app.utils import profiling
 from sqlalchemy.orm import Session
 
 def get_db():
@@ -7,3 +12,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not profiling.ENABLED:
+        raise NotFoundException()
+    if not profiling.is_admin_token(x_admin_token):
+        raise ForbiddenException()
@@ -23,3 +23,11 @@ class ExternalAPIException(HTTPException):
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail={"error": "Service Unavailable", "message": detail},
         )
+
+
+class ForbiddenException(HTTPException):
+    def __init__(self, detail: str = "Admin token required"):
+        super().__init__(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail={"error": "Forbidden", "message": detail},
+        )
@@ -1,6 +1,7 @@
 from fastapi import FastAPI
-from app.database import init_db
-from app.routes import countries
+from app.database import init_db, engine
+from app.routes import countries, admin
+from app.utils import profiling
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import FileResponse
@@ -23,7 +24,13 @@ app = FastAPI(title="Country Currency & Exchange API")
 def on_startup():
     init_db()
 
+# Profiling is opt-in: with no ADMIN_TOKEN nothing is installed at all.
+if profiling.ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware)
+    profiling.install_sql_timing(engine)
+
 app.include_router(countries.router)
+app.include_router(admin.router)
 
 @app.get("/")
 def root():
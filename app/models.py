@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, Index
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -15,3 +15,32 @@ class Country(Base):
     estimated_gdp = Column(Float, nullable=True)
     flag_url = Column(String, nullable=True)
     last_refreshed_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class CountryHistory(Base):
+    """
+    Append-only history of a country's figures, one row per refresh.
+    `recorded_at` is a UTC epoch timestamp so buckets can be computed in SQL
+    on any backend. Compacted rows cover `resolution` seconds and average
+    `samples` raw points (raw rows have resolution 0 and samples 1).
+    The per-column `*_samples` counts exclude NULLs so averages re-weight
+    exactly when points are rolled up again.
+    """
+    __tablename__ = "country_history"
+    __table_args__ = (
+        Index("ix_country_history_name_recorded_at", "country_name", "recorded_at"),
+        # Lets compaction find stale points without scanning the whole table.
+        Index("ix_country_history_resolution_recorded_at", "resolution", "recorded_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    country_name = Column(String, nullable=False)
+    recorded_at = Column(BigInteger, nullable=False)
+    resolution = Column(Integer, nullable=False, default=0)
+    samples = Column(Integer, nullable=False, default=1)
+    population_samples = Column(Integer, nullable=False, default=0)
+    exchange_rate_samples = Column(Integer, nullable=False, default=0)
+    estimated_gdp_samples = Column(Integer, nullable=False, default=0)
+    population = Column(BigInteger, nullable=True)
+    exchange_rate = Column(Float, nullable=True)
+    estimated_gdp = Column(Float, nullable=True)
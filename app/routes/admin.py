@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends
+from typing import List
+
+from app import schemas
+from app.deps import require_admin
+from app.utils.profiling import slow_requests
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin)])
+
+
+# ✅ 1. List recently captured slow requests
+@router.get(
+    "/slow-requests",
+    response_model=List[schemas.SlowRequest],
+    summary="Get the most recent requests slower than SLOW_REQUEST_MS, with their SQL",
+)
+def get_slow_requests():
+    return slow_requests.entries()
+
+
+# ✅ 2. Clear captured slow requests
+@router.delete(
+    "/slow-requests",
+    response_model=schemas.MessageResponse,
+    summary="Clear the captured slow requests",
+)
+def clear_slow_requests():
+    slow_requests.clear()
+    return {"message": "Slow request log cleared."}
@@ -96,7 +96,8 @@ async def refresh_countries(db: Session = Depends(get_db)):
 
         processed_countries.append(country)
 
-    # 4️⃣ Upsert into DB
+    # 4️⃣ Upsert into DB and append to history
+    refreshed_at = datetime.utcnow()
     for country in processed_countries:
         existing = crud.get_country_by_name(db, country["name"])
         if existing:
@@ -108,7 +109,9 @@ async def refresh_countries(db: Session = Depends(get_db)):
             new_country.last_refreshed_at = datetime.utcnow()
             db.add(new_country)
 
+    crud.record_country_history(db, processed_countries, refreshed_at)
     db.commit()
+    crud.compact_country_history(db)
 
     # 5️⃣ Generate summary image
     image_path = crud.generate_summary_image(db)
@@ -179,7 +182,31 @@ def get_country(name: str, db: Session = Depends(get_db)):
     return country
 
 
-# ✅ 6. Delete a country by name
+# ✅ 6. Get a country's exchange rate / GDP history
+@router.get(
+    "/{name}/history",
+    response_model=schemas.CountryHistory,
+    summary="Get a country's exchange rate, GDP and population history",
+)
+def get_country_history(
+    name: str,
+    db: Session = Depends(get_db),
+    start: Optional[datetime] = Query(None, alias="from", description="Only points at or after this time"),
+    end: Optional[datetime] = Query(None, alias="to", description="Only points at or before this time"),
+    bucket: str = Query("raw", description="Downsample to 'raw', 'hour', 'day' or 'week' buckets (UTC; weeks start Monday)"),
+):
+    if bucket not in crud.HISTORY_BUCKETS:
+        raise ValidationException(f"bucket must be one of: {', '.join(crud.HISTORY_BUCKETS)}")
+    # History is kept after a country is deleted, so fall back to it.
+    country = crud.get_country_by_name(db, name=name)
+    history_name = country.name if country else crud.get_history_name(db, name)
+    if not history_name:
+        raise HTTPException(status_code=404, detail=f"Country '{name}' not found")
+    points = crud.get_country_history(db, history_name, start=start, end=end, bucket=bucket)
+    return {"name": history_name, "bucket": bucket, "points": points}
+
+
+# ✅ 7. Delete a country by name
 @router.delete(
     "/{name}",
     response_model=schemas.MessageResponse,
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 
 # ==========================
@@ -42,6 +42,41 @@ class CountryStatus(BaseModel):
     last_refreshed_at: Optional[datetime]
 
 
+# ==========================
+# History schemas (for /countries/{name}/history)
+# ==========================
+class CountryHistoryPoint(BaseModel):
+    timestamp: datetime
+    samples: int = Field(..., description="Number of refreshes averaged into this point")
+    population: Optional[int] = None
+    exchange_rate: Optional[float] = None
+    estimated_gdp: Optional[float] = None
+
+
+class CountryHistory(BaseModel):
+    name: str
+    bucket: str
+    points: List[CountryHistoryPoint]
+
+
+# ==========================
+# Slow request schemas (for /admin/slow-requests)
+# ==========================
+class SlowQuery(BaseModel):
+    statement: str
+    duration_ms: float
+
+
+class SlowRequest(BaseModel):
+    method: str
+    path: str
+    status_code: Optional[int]
+    started_at: datetime
+    duration_ms: float
+    query_count: int
+    queries: List[SlowQuery]
+
+
 # ==========================
 # Generic response schemas
 # ==========================
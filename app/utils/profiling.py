@@ -0,0 +1,308 @@
+# app/utils/profiling.py
+"""
+Opt-in request profiling and slow-request capture.
+
+Everything here is off unless ADMIN_TOKEN is set. When it is:
+- a request sent with an `X-Profile: <ADMIN_TOKEN>` header (or with
+  `?profile=1` plus an `X-Admin-Token: <ADMIN_TOKEN>` header) runs under a
+  sampling profiler and gets folded flame-graph stacks back instead of its
+  normal body. The token is never read from the URL, which ends up in
+  access logs;
+- any request slower than SLOW_REQUEST_MS is kept, with its SQL statements
+  and timings, in a ring buffer of the last SLOW_REQUEST_LIMIT entries.
+"""
+import asyncio
+import hmac
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+ENABLED = bool(ADMIN_TOKEN)
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+SLOW_REQUEST_LIMIT = int(os.getenv("SLOW_REQUEST_LIMIT", "50"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+
+# Cap on SQL statements kept per request, so a chatty route can't blow up
+# memory. Statements past the cap are counted but not stored.
+MAX_QUERIES_PER_REQUEST = 100
+
+# Stacks whose innermost frame is in one of these files are idle threads
+# (event loop waiting on sockets, threadpool workers waiting for work).
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py")
+
+# Per-request QueryLog; None outside a tracked request.
+_current_queries: ContextVar = ContextVar("current_queries", default=None)
+
+# The SamplingProfiler of the request being profiled, if any. anyio copies
+# the request's context into threadpool workers, so this also tells the
+# sampler which worker threads are running that request.
+_active_profiler: ContextVar = ContextVar("active_profiler", default=None)
+
+try:
+    from anyio._backends._asyncio import WorkerThread
+    _WORKER_RUN_CODE = WorkerThread.run.__code__
+except (ImportError, AttributeError):
+    _WORKER_RUN_CODE = None
+    logger.warning(
+        "anyio WorkerThread.run not found; profiles will not include sync (def) routes "
+        "or dependencies that run in the threadpool"
+    )
+
+
+def is_admin_token(token) -> bool:
+    if not ENABLED or not token:
+        return False
+    return hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
+# -------------------------------
+# Sampling profiler
+# -------------------------------
+class SamplingProfiler:
+    """
+    Samples thread stacks from a background thread at a fixed interval and
+    counts identical stacks. Only stacks belonging to the profiled request
+    are kept: on the event loop thread the running task must carry this
+    profiler in its context, and in a threadpool worker the context anyio
+    copied for the current job must.
+    """
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self.samples = 0
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._loop = None
+        self._loop_thread = None
+        self._task = None
+
+    def start(self):
+        """Call from the request's task, after setting _active_profiler."""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._task = asyncio.current_task()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for ident, frame in sys._current_frames().items():
+                if ident == own or frame.f_code.co_filename.endswith(_IDLE_FILES):
+                    continue
+                if not self._owns(ident, frame):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def _owns(self, ident, frame) -> bool:
+        if ident == self._loop_thread:
+            task = asyncio.current_task(self._loop)
+            if task is None:
+                return False
+            if task is self._task:
+                return True
+            # Child tasks spawned by the request (Python 3.12+ exposes their context).
+            get_context = getattr(task, "get_context", None)
+            return get_context is not None and get_context().get(_active_profiler) is self
+
+        # Find the anyio worker loop at the bottom of the stack and check the
+        # context it is currently running the job in.
+        while frame is not None:
+            if frame.f_code is _WORKER_RUN_CODE:
+                context = frame.f_locals.get("context")
+                return context is not None and context.get(_active_profiler) is self
+            frame = frame.f_back
+        return False
+
+    def folded(self) -> str:
+        """Stacks in the folded format read by flamegraph.pl and speedscope."""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+# -------------------------------
+# Per-request SQL log
+# -------------------------------
+class QueryLog:
+    """SQL run during one request; only the first MAX_QUERIES_PER_REQUEST are kept."""
+
+    __slots__ = ("count", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+
+    def add(self, statement: str, duration_ms: float):
+        self.count += 1
+        if len(self.statements) < MAX_QUERIES_PER_REQUEST:
+            self.statements.append((statement, duration_ms))
+
+
+# -------------------------------
+# Slow-request log
+# -------------------------------
+class SlowRequestLog:
+    def __init__(self, limit: int = SLOW_REQUEST_LIMIT):
+        self._entries = deque(maxlen=limit)
+        self._lock = threading.Lock()
+
+    def add(self, entry: dict):
+        with self._lock:
+            self._entries.append(entry)
+
+    def entries(self) -> list:
+        """Most recent first."""
+        with self._lock:
+            return list(reversed(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+slow_requests = SlowRequestLog()
+
+
+# -------------------------------
+# SQL timing
+# -------------------------------
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_queries.get() is not None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    queries = _current_queries.get()
+    if queries is None:
+        return
+    starts = conn.info.get("query_start_time")
+    if not starts:
+        return
+    queries.add(statement, (time.perf_counter() - starts.pop()) * 1000)
+
+
+def install_sql_timing(engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# -------------------------------
+# Middleware
+# -------------------------------
+def _profile_requested(scope) -> bool:
+    profile_header = admin_header = None
+    for name, value in scope["headers"]:
+        if name == b"x-profile":
+            profile_header = value
+        elif name == b"x-admin-token":
+            admin_header = value
+    if profile_header is not None:
+        return is_admin_token(profile_header.decode("latin-1"))
+    # `?profile=1` is only a switch; the token must still come in a header.
+    if admin_header is not None and b"profile=1" in scope.get("query_string", b"").split(b"&"):
+        return is_admin_token(admin_header.decode("latin-1"))
+    return False
+
+
+class ProfilingMiddleware:
+    """
+    Plain ASGI middleware (no BaseHTTPMiddleware task overhead) that times
+    every request, records slow ones and profiles the ones that ask for it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profiler = None
+        if _profile_requested(scope):
+            profiler = SamplingProfiler()
+
+        status = {}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            if profiler is None:
+                await send(message)
+
+        queries = QueryLog()
+        token = _current_queries.set(queries)
+        started_at = datetime.now(timezone.utc)
+        start = time.perf_counter()
+        if profiler:
+            profiler_token = _active_profiler.set(profiler)
+            profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profiler:
+                profiler.stop()
+                _active_profiler.reset(profiler_token)
+            duration_ms = (time.perf_counter() - start) * 1000
+            _current_queries.reset(token)
+
+            if duration_ms >= SLOW_REQUEST_MS:
+                slow_requests.add({
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status_code": status.get("code"),
+                    "started_at": started_at.isoformat(),
+                    "duration_ms": round(duration_ms, 3),
+                    "query_count": queries.count,
+                    "queries": [
+                        {"statement": statement, "duration_ms": round(elapsed, 3)}
+                        for statement, elapsed in queries.statements
+                    ],
+                })
+
+        if profiler:
+            await _send_profile(send, scope, status.get("code"), duration_ms, profiler)
+
+
+async def _send_profile(send, scope, status_code, duration_ms, profiler):
+    body = json.dumps({
+        "method": scope["method"],
+        "path": scope["path"],
+        "status_code": status_code,
+        "duration_ms": round(duration_ms, 3),
+        "interval_ms": profiler.interval * 1000,
+        "samples": profiler.samples,
+        "folded": profiler.folded(),
+    }).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
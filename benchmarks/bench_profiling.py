@@ -0,0 +1,87 @@
+"""
+Measure the cost of the profiling middleware and SQL timing hooks on
+requests that are *not* being profiled.
+
+    python benchmarks/bench_profiling.py
+
+Compares a trivial ASGI app called directly (no server, no network) with
+and without ProfilingMiddleware, and a SQLite query with and without the
+cursor-execute listeners.
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("ADMIN_TOKEN", "bench-token")
+
+from sqlalchemy import create_engine, text
+
+from app.utils import profiling
+
+REQUESTS = 50_000
+QUERIES = 20_000
+
+
+async def bare_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message):
+    pass
+
+
+SCOPE = {
+    "type": "http",
+    "method": "GET",
+    "path": "/countries",
+    "query_string": b"region=europe",
+    "headers": [(b"host", b"localhost"), (b"accept", b"application/json"), (b"user-agent", b"bench")],
+}
+
+
+async def time_requests(app) -> float:
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        await app(SCOPE, receive, send)
+    return (time.perf_counter() - start) / REQUESTS * 1e6
+
+
+def time_queries(engine, tracked: bool) -> float:
+    token = profiling._current_queries.set(profiling.QueryLog() if tracked else None)
+    try:
+        with engine.connect() as conn:
+            start = time.perf_counter()
+            for _ in range(QUERIES):
+                conn.execute(text("SELECT 1")).scalar()
+            elapsed = time.perf_counter() - start
+    finally:
+        profiling._current_queries.reset(token)
+    return elapsed / QUERIES * 1e6
+
+
+def main():
+    base = asyncio.run(time_requests(bare_app))
+    wrapped = asyncio.run(time_requests(profiling.ProfilingMiddleware(bare_app)))
+    print(f"request, no middleware:        {base:7.2f} us")
+    print(f"request, middleware (no flag): {wrapped:7.2f} us  (+{wrapped - base:.2f} us)")
+
+    plain = create_engine("sqlite://")
+    hooked = create_engine("sqlite://")
+    profiling.install_sql_timing(hooked)
+    q_plain = time_queries(plain, tracked=False)
+    q_idle = time_queries(hooked, tracked=False)
+    q_tracked = time_queries(hooked, tracked=True)
+    print(f"query, no listeners:           {q_plain:7.2f} us")
+    print(f"query, listeners, untracked:   {q_idle:7.2f} us  (+{q_idle - q_plain:.2f} us)")
+    print(f"query, listeners, tracked:     {q_tracked:7.2f} us  (+{q_tracked - q_plain:.2f} us)")
+
+
+if __name__ == "__main__":
+    main()
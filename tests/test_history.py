@@ -0,0 +1,156 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import crud, models
+
+NOW = datetime(2026, 10, 18, tzinfo=timezone.utc)
+
+
+def seed(db, points):
+    """points: iterable of (datetime, population, exchange_rate, estimated_gdp)."""
+    for ts, population, rate, gdp in points:
+        crud.record_country_history(
+            db,
+            [{"name": "France", "population": population, "exchange_rate": rate, "estimated_gdp": gdp}],
+            ts,
+        )
+    db.commit()
+
+
+def history(db, bucket, start=None, end=None):
+    return crud.get_country_history(db, "France", start=start, end=end, bucket=bucket)
+
+
+def test_raw_history_is_ordered_and_filtered(db):
+    seed(db, [
+        (NOW - timedelta(hours=2), 10, 1.0, 100.0),
+        (NOW - timedelta(hours=1), 20, 2.0, 200.0),
+        (NOW, 30, 3.0, 300.0),
+    ])
+
+    points = history(db, "raw", start=NOW - timedelta(hours=1))
+
+    assert [p["population"] for p in points] == [20, 30]
+    assert points[0]["timestamp"] == NOW - timedelta(hours=1)
+    assert all(p["samples"] == 1 for p in points)
+
+
+def test_hour_bucket_averages_ignore_nulls(db):
+    start = NOW - timedelta(hours=1)
+    seed(db, [
+        (start, 100, 1.0, None),
+        (start + timedelta(minutes=20), 200, None, None),
+        (start + timedelta(minutes=40), 300, 3.0, None),
+    ])
+
+    [point] = history(db, "hour")
+
+    assert point["timestamp"] == start
+    assert point["samples"] == 3
+    assert point["population"] == 200
+    assert point["exchange_rate"] == pytest.approx(2.0)
+    assert point["estimated_gdp"] is None
+
+
+def test_week_buckets_start_on_monday(db):
+    seed(db, [(NOW - timedelta(days=d), 1, 1.0, 1.0) for d in range(21)])
+
+    points = history(db, "week")
+
+    assert points
+    for point in points:
+        assert point["timestamp"].weekday() == 0
+        assert point["timestamp"].hour == 0
+    assert sum(p["samples"] for p in points) == 21
+
+
+def test_compaction_preserves_bucket_samples_and_averages(db):
+    # Every 30 minutes for 120 days, so both retention tiers kick in.
+    seed(db, [
+        (NOW - timedelta(minutes=30 * i), 1000 + i % 3, 1.0 + i % 2, None if i % 5 == 0 else float(i % 7))
+        for i in range(48 * 120)
+    ])
+    window = dict(start=NOW - timedelta(days=120), end=NOW)
+    before = history(db, "day", **window)
+    rows_before = db.query(models.CountryHistory).count()
+
+    removed = crud.compact_country_history(db, now=NOW)
+
+    after = history(db, "day", **window)
+    rows_after = db.query(models.CountryHistory).count()
+    assert removed == rows_before - rows_after
+    assert rows_after < rows_before
+
+    assert [(p["timestamp"], p["samples"]) for p in after] == [(p["timestamp"], p["samples"]) for p in before]
+    for old, new in zip(before, after):
+        assert new["exchange_rate"] == pytest.approx(old["exchange_rate"])
+        assert new["estimated_gdp"] == pytest.approx(old["estimated_gdp"])
+        assert abs(new["population"] - old["population"]) <= 1
+
+
+def test_compaction_tiers(db):
+    seed(db, [
+        (NOW - timedelta(days=1), 1, 1.0, 1.0),
+        (NOW - timedelta(days=10), 1, 1.0, 1.0),
+        (NOW - timedelta(days=100), 1, 1.0, 1.0),
+    ])
+
+    crud.compact_country_history(db, now=NOW)
+
+    resolutions = sorted(r for (r,) in db.query(models.CountryHistory.resolution))
+    assert resolutions == [0, 3600, 86400]
+
+
+def test_compaction_is_idempotent(db):
+    seed(db, [(NOW - timedelta(days=30, minutes=10 * i), 1, 1.0, 1.0) for i in range(12)])
+
+    crud.compact_country_history(db, now=NOW)
+
+    assert crud.compact_country_history(db, now=NOW) == 0
+
+
+def test_overlapping_compactions_do_not_double_count(db):
+    # Every 30 minutes for 20 days; compact, add more points, then compact
+    # again two days later so the second run's stale window overlaps the first.
+    seed(db, [(NOW - timedelta(minutes=30 * i), 100, 1.0, 1.0) for i in range(48 * 20)])
+    crud.compact_country_history(db, now=NOW)
+    seed(db, [(NOW + timedelta(minutes=30 * i), 100, 1.0, 1.0) for i in range(1, 48 * 2)])
+    before = history(db, "day")
+
+    removed = crud.compact_country_history(db, now=NOW + timedelta(days=2))
+
+    assert removed >= 0
+    assert history(db, "day") == before
+    assert sum(p["samples"] for p in history(db, "raw")) == 48 * 22 - 1
+    timestamps = [p["timestamp"] for p in history(db, "raw")]
+    assert len(timestamps) == len(set(timestamps))
+
+
+def test_old_points_roll_up_to_monday_weeks_then_expire(db):
+    seed(db, [
+        (NOW - timedelta(days=400), 1, 1.0, 1.0),
+        (NOW - timedelta(days=401), 3, 3.0, 3.0),
+        (NOW - timedelta(days=6 * 365), 1, 1.0, 1.0),
+    ])
+
+    crud.compact_country_history(db, now=NOW)
+
+    [row] = db.query(models.CountryHistory).all()
+    assert row.resolution == 604800
+    assert row.samples == 2
+    assert datetime.fromtimestamp(row.recorded_at, timezone.utc).weekday() == 0
+
+
+def test_history_endpoint_outlives_country(db, client):
+    db.add(models.Country(name="France", population=100))
+    db.commit()
+    seed(db, [(NOW, 100, 1.0, 1.0)])
+
+    assert client.delete("/countries/france").status_code == 200
+
+    response = client.get("/countries/FRANCE/history")
+    assert response.status_code == 200
+    assert response.json()["name"] == "France"
+    assert len(response.json()["points"]) == 1
+    assert client.get("/countries/spain/history").status_code == 404
@@ -0,0 +1,161 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from app.utils import profiling
+
+ADMIN = {"X-Admin-Token": "s3cret"}
+
+
+@pytest.fixture(autouse=True)
+def admin_token(monkeypatch):
+    monkeypatch.setattr(profiling, "ADMIN_TOKEN", "s3cret")
+    monkeypatch.setattr(profiling, "ENABLED", True)
+    profiling.slow_requests.clear()
+    yield
+    profiling.slow_requests.clear()
+
+
+@pytest.fixture
+def profiled_client():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    profiling.install_sql_timing(engine)
+    app = FastAPI()
+    app.add_middleware(profiling.ProfilingMiddleware)
+
+    @app.get("/queries/{n}")
+    def run_queries(n: int):
+        with engine.connect() as conn:
+            for i in range(n):
+                conn.execute(text(f"SELECT {i}")).scalar()
+        return {"ran": n}
+
+    @app.get("/sync")
+    def sync_route():
+        time.sleep(0.2)
+        return {"ok": True}
+
+    @app.get("/async")
+    async def async_route():
+        time.sleep(0.2)
+        await asyncio.sleep(0)
+        return {"ok": True}
+
+    yield TestClient(app)
+    engine.dispose()
+
+
+def scope(headers=(), query_string=b""):
+    return {"type": "http", "headers": list(headers), "query_string": query_string}
+
+
+def test_profile_header_with_token():
+    assert profiling._profile_requested(scope([(b"x-profile", b"s3cret")]))
+    assert not profiling._profile_requested(scope([(b"x-profile", b"wrong")]))
+
+
+def test_token_in_query_string_is_ignored():
+    assert not profiling._profile_requested(scope(query_string=b"profile=s3cret"))
+
+
+def test_query_switch_needs_admin_header():
+    assert not profiling._profile_requested(scope(query_string=b"profile=1"))
+    assert profiling._profile_requested(scope([(b"x-admin-token", b"s3cret")], b"region=europe&profile=1"))
+    assert not profiling._profile_requested(scope([(b"x-admin-token", b"wrong")], b"profile=1"))
+
+
+def test_anyio_worker_hook_is_available():
+    # Without it sync routes silently profile as empty.
+    assert profiling._WORKER_RUN_CODE is not None
+
+
+@pytest.mark.parametrize("path, frame", [("/sync", "sync_route"), ("/async", "async_route")])
+def test_profiled_request_returns_flame_data(profiled_client, path, frame):
+    response = profiled_client.get(path, headers={"X-Profile": "s3cret"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["path"] == path
+    assert body["status_code"] == 200
+    assert body["samples"] > 0
+    assert body["folded"]
+    assert frame in body["folded"]
+
+
+def test_unprofiled_request_returns_normal_body(profiled_client):
+    assert profiled_client.get("/sync").json() == {"ok": True}
+
+
+def test_slow_request_recorded_with_sql(profiled_client, monkeypatch):
+    monkeypatch.setattr(profiling, "SLOW_REQUEST_MS", 0)
+
+    profiled_client.get("/queries/2")
+
+    [entry] = profiling.slow_requests.entries()
+    assert entry["path"] == "/queries/2"
+    assert entry["status_code"] == 200
+    assert entry["query_count"] == 2
+    assert [q["statement"] for q in entry["queries"]] == ["SELECT 0", "SELECT 1"]
+    assert all(q["duration_ms"] >= 0 for q in entry["queries"])
+
+
+def test_fast_request_not_recorded(profiled_client, monkeypatch):
+    monkeypatch.setattr(profiling, "SLOW_REQUEST_MS", 60_000)
+
+    profiled_client.get("/queries/2")
+
+    assert profiling.slow_requests.entries() == []
+
+
+def test_statements_past_cap_are_counted_not_kept(profiled_client, monkeypatch):
+    monkeypatch.setattr(profiling, "SLOW_REQUEST_MS", 0)
+    monkeypatch.setattr(profiling, "MAX_QUERIES_PER_REQUEST", 3)
+
+    profiled_client.get("/queries/5")
+
+    [entry] = profiling.slow_requests.entries()
+    assert entry["query_count"] == 5
+    assert len(entry["queries"]) == 3
+
+
+def test_slow_request_log_drops_oldest():
+    log = profiling.SlowRequestLog(limit=2)
+    for i in range(3):
+        log.add({"path": f"/{i}"})
+
+    assert [e["path"] for e in log.entries()] == ["/2", "/1"]
+
+
+def test_admin_endpoint_not_found_when_disabled(client, monkeypatch):
+    monkeypatch.setattr(profiling, "ENABLED", False)
+
+    assert client.get("/admin/slow-requests", headers=ADMIN).status_code == 404
+
+
+def test_admin_endpoint_requires_token(client):
+    assert client.get("/admin/slow-requests").status_code == 403
+    assert client.get("/admin/slow-requests", headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+
+def test_admin_endpoint_lists_and_clears(client):
+    profiling.slow_requests.add({
+        "method": "GET",
+        "path": "/countries",
+        "status_code": 200,
+        "started_at": "2026-10-18T00:00:00+00:00",
+        "duration_ms": 1500.0,
+        "query_count": 1,
+        "queries": [{"statement": "SELECT 1", "duration_ms": 0.1}],
+    })
+
+    response = client.get("/admin/slow-requests", headers=ADMIN)
+    assert response.status_code == 200
+    assert [e["path"] for e in response.json()] == ["/countries"]
+
+    assert client.delete("/admin/slow-requests", headers=ADMIN).status_code == 200
+    assert client.get("/admin/slow-requests", headers=ADMIN).json() == []